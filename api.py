@@ -0,0 +1,147 @@
+import json
+import os
+import socket
+import threading
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+
+from storage import MAX_CACHED_BYTES, endpoint_size, load_endpoint_bytes, loads_json, open_endpoint, update_endpoint
+
+# --- Configuration ---
+# The API runs as its own process next to the Streamlit UI (`python api.py`),
+# started from the same directory so both share endpoints/, or inside the
+# Streamlit process when app.py is run with EMBED_API=1.
+API_HOST = os.getenv("API_HOST", "")
+API_PORT = int(os.getenv("API_PORT", "8502"))
+# Number of listening sockets bound to API_PORT with SO_REUSEPORT; the kernel
+# spreads incoming connections across them. Several `python api.py` processes
+# can share the port the same way.
+API_LISTENERS = int(os.getenv("API_LISTENERS", "1"))
+# Idle keep-alive connections are closed after API_IDLE_TIMEOUT seconds, so
+# their per-connection threads don't linger.
+API_IDLE_TIMEOUT = float(os.getenv("API_IDLE_TIMEOUT", "5"))
+MAX_BODY_BYTES = 1 << 20
+# Endpoint files at least this large are streamed to the socket, not read whole;
+# smaller ones come from storage's byte cache, which holds nothing larger.
+STREAM_MIN_BYTES = MAX_CACHED_BYTES
+
+NOT_FOUND = b'{"error": "Endpoint not found"}'
+
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    """Serves endpoints over plain HTTP: GET /<name> reads, POST /<name> updates."""
+
+    protocol_version = "HTTP/1.1"
+    timeout = API_IDLE_TIMEOUT
+    # Buffer the response so the status line, headers and body leave in one send.
+    wbufsize = -1
+
+    def _endpoint_name(self):
+        return unquote(urlsplit(self.path).path.strip("/"))
+
+    def _send_json_headers(self, status, length, close=False):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(length))
+        if close:
+            # The request body was left unread, so the connection can't be reused.
+            self.send_header("Connection", "close")
+            self.close_connection = True
+        self.end_headers()
+
+    def _send_json(self, status, body, close=False):
+        self._send_json_headers(status, len(body), close)
+        self.wfile.write(body)
+
+    def _send_error_json(self, status, message, close=False):
+        self._send_json(status, json.dumps({"error": message}).encode(), close)
+
+    def do_GET(self):
+        name = self._endpoint_name()
+        size = endpoint_size(name)
+        if size is not None and size < STREAM_MIN_BYTES:
+            # Small payloads are served from the store's byte cache.
+            body = load_endpoint_bytes(name)
+            if body is not None:
+                self._send_json(HTTPStatus.OK, body)
+                return
+        f = open_endpoint(name) if size is not None else None
+        if f is None:
+            self._send_json(HTTPStatus.NOT_FOUND, NOT_FOUND)
+            return
+        with f:
+            # Large payloads go from the file straight to the socket, so the
+            # whole body is never held in memory. The size is re-read from the
+            # open handle, since a save may have swapped the file meanwhile.
+            size = os.fstat(f.fileno()).st_size
+            self._send_json_headers(HTTPStatus.OK, size)
+            self.wfile.flush()
+            self.connection.sendfile(f)
+
+    def do_POST(self):
+        name = self._endpoint_name()
+        header = self.headers.get("Content-Length")
+        if header is None:
+            self._send_error_json(HTTPStatus.LENGTH_REQUIRED, "Content-Length required.", close=True)
+            return
+        try:
+            length = int(header)
+        except ValueError:
+            length = -1
+        if length < 0:
+            self._send_error_json(HTTPStatus.BAD_REQUEST, "Invalid Content-Length.", close=True)
+            return
+        if length > MAX_BODY_BYTES:
+            self._send_error_json(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Payload too large.", close=True)
+            return
+        raw = self.rfile.read(length)
+
+        try:
+            incoming_data = loads_json(raw)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            self._send_error_json(HTTPStatus.BAD_REQUEST, "Invalid JSON format.")
+            return
+        if not isinstance(incoming_data, dict):
+            self._send_error_json(HTTPStatus.BAD_REQUEST, "Updates must be JSON objects.")
+            return
+        try:
+            result = update_endpoint(name, incoming_data)
+        except TypeError:
+            self._send_error_json(HTTPStatus.BAD_REQUEST, "Updates must be JSON objects.")
+            return
+        if result is None:
+            self._send_json(HTTPStatus.NOT_FOUND, NOT_FOUND)
+            return
+        payload, _ = result
+        self._send_json(HTTPStatus.OK, payload)
+
+
+class ReusePortHTTPServer(ThreadingHTTPServer):
+    """ThreadingHTTPServer that lets other listeners bind the same port."""
+
+    # Webhook bursts arrive all at once; the default backlog of 5 resets them.
+    request_queue_size = 128
+
+    def server_bind(self):
+        if hasattr(socket, "SO_REUSEPORT"):
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        super().server_bind()
+
+
+def run_api_server(host=API_HOST, port=API_PORT, listeners=API_LISTENERS):
+    """Serves the endpoint API until interrupted."""
+    if not hasattr(socket, "SO_REUSEPORT"):
+        listeners = 1
+    servers = [ReusePortHTTPServer((host, port), WebhookHandler) for _ in range(max(listeners, 1))]
+    for httpd in servers[1:]:
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    try:
+        servers[0].serve_forever()
+    finally:
+        for httpd in servers:
+            httpd.server_close()
+
+
+if __name__ == "__main__":
+    run_api_server()
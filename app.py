@@ -1,47 +1,47 @@
 import streamlit as st
 import json
-from pathlib import Path
-import threading
 import os
-import time
-
-# --- Configuration & Data Persistence ---
-DATA_FILE = Path("endpoints.json")
-file_lock = threading.Lock()
-
-def load_endpoints():
-    """Loads the endpoints dictionary from the JSON file safely."""
-    with file_lock:
-        if DATA_FILE.exists():
-            try:
-                with open(DATA_FILE, "r") as f:
-                    return json.load(f)
-            except (json.JSONDecodeError, ValueError):
-                return {}
-    return {}
-
-def save_endpoints(endpoints_dict):
-    """Saves the endpoints dictionary to the JSON file safely."""
-    with file_lock:
-        with open(DATA_FILE, "w") as f:
-            json.dump(endpoints_dict, f, indent=2)
+import string
+import threading
+from urllib.parse import quote
+
+from api import run_api_server
+from storage import (
+    delete_endpoint,
+    endpoint_name_too_long,
+    list_endpoints,
+    load_endpoint_bytes,
+    loads_json,
+    save_endpoint,
+    update_endpoint,
+)
+
+# --- Embedded API Server ---
+# With EMBED_API=1 the HTTP API from api.py runs on a daemon thread inside the
+# Streamlit process. st.cache_resource starts it once per process, shared by
+# every session, instead of re-checking on each rerun.
+@st.cache_resource(show_spinner=False)
+def start_api_server():
+    thread = threading.Thread(target=run_api_server, name="endpoint-api", daemon=True)
+    thread.start()
+    return thread
+
+if os.getenv("EMBED_API") == "1":
+    start_api_server()
 
 # --- Main Application Logic ---
-st.set_page_config(page_title="API Endpoint Manager", layout="wide")
-
-# --- Dynamic Base URL for Deployment ---
-BASE_URL = os.getenv("STREAMLIT_URL", "http://localhost:8501")
 
 # --- (FIX) Simplified & Robust API Handling ---
 # This logic now ONLY handles external GET requests. It is completely isolated
-# from the UI's update functionality, preventing any redirect loops.
-query_params = st.query_params.to_dict()
-endpoint_name = query_params.get("endpoint")
+# from the UI's update functionality, preventing any redirect loops. It runs
+# before any page setup so API hits skip the UI configuration entirely.
+endpoint_name = st.query_params.get("endpoint")
 
 if endpoint_name:
-    endpoints_data = load_endpoints()
-    if endpoint_name in endpoints_data:
-        st.json(endpoints_data[endpoint_name])
+    # Serve the stored JSON text as-is; st.json only re-encodes non-str bodies.
+    endpoint_bytes = load_endpoint_bytes(endpoint_name)
+    if endpoint_bytes is not None:
+        st.json(endpoint_bytes.decode())
     else:
         st.status_code = 404
         st.json({"error": "Endpoint not found"})
@@ -49,6 +49,117 @@ if endpoint_name:
     st.stop()
 
 # --- UI Management Mode (Default View) ---
+st.set_page_config(page_title="API Endpoint Manager", layout="wide")
+
+# Success messages left by the form callbacks are shown once here as a toast,
+# which doesn't block the script the way sleeping before st.rerun() did.
+flash = st.session_state.pop("_flash", None)
+if flash:
+    st.toast(flash, icon="✅")
+
+# --- Dynamic Base URL for Deployment ---
+BASE_URL = os.getenv("STREAMLIT_URL", "http://localhost:8501")
+# Public URL of the API sidecar (api.py), e.g. "https://example.com:8502". Only
+# the deployment knows how (or whether) the API port is reachable from outside,
+# so links point there only when API_URL is set, even with EMBED_API=1;
+# otherwise they use ?endpoint= on BASE_URL.
+API_URL = os.getenv("API_URL", "").rstrip("/") or None
+
+# --- Input Validation ---
+MAX_JSON_CHARS = 1 << 20
+
+# Lowercases ASCII letters and turns spaces into underscores in one pass.
+_NAME_TABLE = str.maketrans(" " + string.ascii_uppercase, "_" + string.ascii_lowercase)
+
+def normalize_endpoint_name(name):
+    """Turns user input into an endpoint key, e.g. " User Info" -> "user_info"."""
+    name = name.strip()
+    if name.isascii():
+        return name.translate(_NAME_TABLE)
+    return name.lower().replace(" ", "_")
+
+def json_input_error(text):
+    """Cheaply rejects oversized input or anything but a JSON object before parsing.
+
+    Valid JSON that starts with "{" is always an object, so checking the first
+    character is enough. Returns an error message, or None if the text is
+    worth parsing.
+    """
+    if len(text) > MAX_JSON_CHARS:
+        return f"Payload too large (limit is {MAX_JSON_CHARS:,} characters)."
+    if text.lstrip()[:1] != "{":
+        return "Not a JSON object: data must start with '{'."
+    return None
+
+# --- Form Callbacks ---
+# Both forms do their work in on_click callbacks, which Streamlit runs before
+# the script. A successful save is therefore already visible in that same
+# run, with no second st.rerun(). A failed one leaves feedback for its form
+# to show.
+def set_form_feedback(form_key, level, message):
+    st.session_state[f"_{form_key}_feedback"] = (level, message)
+
+def show_form_feedback(form_key):
+    """Shows the error or warning a form's callback left behind, once."""
+    feedback = st.session_state.pop(f"_{form_key}_feedback", None)
+    if feedback:
+        level, message = feedback
+        {"info": st.info, "warning": st.warning, "error": st.error}[level](message)
+
+def create_endpoint_callback():
+    """Validates and saves the create form's input."""
+    name = st.session_state["new_endpoint_name"]
+    json_data_str = st.session_state["new_endpoint_json"]
+    if not (name and json_data_str):
+        set_form_feedback("create_endpoint_form", "warning", "Please provide both an endpoint name and JSON data.")
+        return
+    clean_name = normalize_endpoint_name(name)
+    if endpoint_name_too_long(clean_name):
+        set_form_feedback("create_endpoint_form", "error", "Endpoint name is too long. Please choose a shorter name.")
+        return
+    input_error = json_input_error(json_data_str)
+    if input_error:
+        set_form_feedback("create_endpoint_form", "error", input_error)
+        return
+    try:
+        save_endpoint(clean_name, loads_json(json_data_str))
+    except json.JSONDecodeError:
+        set_form_feedback("create_endpoint_form", "error", "Invalid JSON format. Please check your data.")
+        return
+    st.session_state["_flash"] = f"Endpoint '{clean_name}' saved successfully!"
+
+def update_endpoint_callback():
+    """Merges the update form's JSON into an existing endpoint."""
+    name = st.session_state["post_endpoint_name"]
+    post_json_data = st.session_state["post_endpoint_json"]
+    if not (name and post_json_data):
+        set_form_feedback("post_endpoint_form", "warning", "Please provide both an endpoint name and the JSON data for the update.")
+        return
+    clean_post_name = normalize_endpoint_name(name)
+    input_error = json_input_error(post_json_data)
+    if input_error:
+        set_form_feedback("post_endpoint_form", "error", input_error)
+        return
+    try:
+        incoming_data = loads_json(post_json_data)
+    except json.JSONDecodeError:
+        set_form_feedback("post_endpoint_form", "error", "Invalid JSON format in the update data.")
+        return
+    try:
+        # Re-read, merge and save under the store lock, so concurrent updates
+        # never drop each other's keys.
+        result = update_endpoint(clean_post_name, incoming_data)
+    except TypeError:
+        set_form_feedback("post_endpoint_form", "error", f"Endpoint '{clean_post_name}' does not hold a JSON object, so it cannot be merged into.")
+        return
+    if result is None:
+        set_form_feedback("post_endpoint_form", "error", f"Endpoint '{clean_post_name}' not found.")
+        return
+    if not result[1]:
+        set_form_feedback("post_endpoint_form", "info", f"Endpoint '{clean_post_name}' already has this data; nothing to update.")
+        return
+    st.session_state["_flash"] = f"Endpoint '{clean_post_name}' updated successfully!"
+
 st.title("🚀 Live JSON Endpoint Manager")
 st.markdown("Create, manage, and view simple JSON endpoints. These endpoints are publicly readable (GET requests).")
 
@@ -57,89 +168,82 @@ with st.form(key="create_endpoint_form"):
     st.subheader("Create or Update an Endpoint")
     col1, col2 = st.columns([1, 2])
     with col1:
-        new_endpoint_name = st.text_input("Endpoint Name", placeholder="e.g., userinfo")
+        st.text_input("Endpoint Name", key="new_endpoint_name", placeholder="e.g., userinfo")
     with col2:
-        json_data_str = st.text_area("Initial JSON Data", height=150, placeholder='{\n  "name": "ahmed",\n  "status": "pending"\n}')
+        st.text_area("Initial JSON Data", key="new_endpoint_json", height=150, max_chars=MAX_JSON_CHARS, placeholder='{\n  "name": "ahmed",\n  "status": "pending"\n}')
     
-    submit_button = st.form_submit_button(label="💾 Save Endpoint", use_container_width=True)
-
-    if submit_button:
-        if new_endpoint_name and json_data_str:
-            clean_name = new_endpoint_name.strip().lower().replace(" ", "_")
-            try:
-                endpoints_data = load_endpoints()
-                endpoints_data[clean_name] = json.loads(json_data_str)
-                save_endpoints(endpoints_data)
-                st.success(f"Endpoint '{clean_name}' saved successfully!")
-                time.sleep(1) # Brief pause to let user see the message
-                st.rerun()
-            except json.JSONDecodeError:
-                st.error("Invalid JSON format. Please check your data.")
-        else:
-            st.warning("Please provide both an endpoint name and JSON data.")
+    st.form_submit_button(label="💾 Save Endpoint", use_container_width=True, on_click=create_endpoint_callback)
+    show_form_feedback("create_endpoint_form")
 
 st.subheader("Test Endpoint Updates (POST Simulation)")
-st.info("This form simulates updating an endpoint's JSON data. Note: The endpoints do not accept true `POST` requests from external services; this is for testing via the UI only.", icon="ℹ️")
+if API_URL:
+    st.info(f"This form simulates updating an endpoint's JSON data. External services can send the same update as a `POST` to `{API_URL}/<endpoint>`.", icon="ℹ️")
+else:
+    st.info("This form simulates updating an endpoint's JSON data. Note: The endpoints do not accept true `POST` requests from external services; this is for testing via the UI only.", icon="ℹ️")
 
 # --- (FIX) Simplified Update Form Logic ---
 # This form now handles the update directly without manipulating query parameters.
 with st.form(key="post_endpoint_form"):
     col1, col2 = st.columns([1, 2])
     with col1:
-        post_endpoint_name = st.text_input("Endpoint to Update", placeholder="e.g., userinfo")
+        st.text_input("Endpoint to Update", key="post_endpoint_name", placeholder="e.g., userinfo")
     with col2:
-        post_json_data = st.text_area("JSON Data to Update With", height=150, placeholder='{\n  "status": "completed"\n}')
+        st.text_area("JSON Data to Update With", key="post_endpoint_json", height=150, max_chars=MAX_JSON_CHARS, placeholder='{\n  "status": "completed"\n}')
     
-    post_submit_button = st.form_submit_button(label="📤 Send Update", use_container_width=True)
-
-    if post_submit_button:
-        if post_endpoint_name and post_json_data:
-            clean_post_name = post_endpoint_name.strip().lower().replace(" ", "_")
-            endpoints_data = load_endpoints()
-            
-            if clean_post_name in endpoints_data:
-                try:
-                    # Directly load, update, and save the data
-                    incoming_data = json.loads(post_json_data)
-                    endpoints_data[clean_post_name].update(incoming_data)
-                    save_endpoints(endpoints_data)
-                    st.success(f"Endpoint '{clean_post_name}' updated successfully!")
-                    time.sleep(1) # Brief pause before rerun
-                    st.rerun() # Single, safe rerun to refresh the UI
-                except json.JSONDecodeError:
-                    st.error("Invalid JSON format in the update data.")
-            else:
-                st.error(f"Endpoint '{clean_post_name}' not found.")
-        else:
-            st.warning("Please provide both an endpoint name and the JSON data for the update.")
+    st.form_submit_button(label="📤 Send Update", use_container_width=True, on_click=update_endpoint_callback)
+    show_form_feedback("post_endpoint_form")
 
 st.divider()
 
-# Display existing endpoints
-endpoints_data = load_endpoints()
-if endpoints_data:
-    st.subheader("📋 Your Live Endpoints")
-    st.info(f"Your public base URL is: `{BASE_URL}`")
+# Display existing endpoints. Only names are listed up front; an endpoint's
+# JSON is read and rendered only once its card is toggled open. The grid is a
+# fragment, so deleting, paging or toggling a card reruns just the grid, not
+# the forms above it.
+PAGE_SIZE = 20
+
+@st.fragment
+def render_endpoints():
+    endpoint_names = list_endpoints()
+    if endpoint_names:
+        st.subheader("📋 Your Live Endpoints")
+        st.info(f"Your public base URL is: `{API_URL or BASE_URL}`")
     
-    num_columns = 2
-    cols = st.columns(num_columns)
+        # Only one page of cards is built per run, however many endpoints exist.
+        page_count = -(-len(endpoint_names) // PAGE_SIZE)
+        page = 1
+        if page_count > 1:
+            # Keep the stored page in range after deletions shrink the list.
+            if st.session_state.get("endpoint_page", 1) > page_count:
+                st.session_state["endpoint_page"] = page_count
+            page = st.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count, step=1, key="endpoint_page")
+        page_names = endpoint_names[(page - 1) * PAGE_SIZE:page * PAGE_SIZE]
+
+        num_columns = 2
+        cols = st.columns(num_columns)
     
-    for idx, (key, data) in enumerate(endpoints_data.items()):
-        with cols[idx % num_columns]:
-            with st.container(border=True):
-                st.markdown(f"### {key}")
-                api_url = f"{BASE_URL}?endpoint={key}"
-                st.markdown("**Webhook URL (GET):**")
-                st.code(api_url, language="text")
-
-                with st.expander("View Current JSON"):
-                    st.json(data)
-
-                if st.button("🗑️ Delete", key=f"del_{key}", use_container_width=True, type="secondary"):
-                    endpoints = load_endpoints()
-                    if key in endpoints:
-                        del endpoints[key]
-                        save_endpoints(endpoints)
-                        st.rerun()
-else:
-    st.info("You haven't created any endpoints yet. Use the form above to get started.")
+        for idx, key in enumerate(page_names):
+            with cols[idx % num_columns]:
+                with st.container(border=True):
+                    st.markdown(f"### {key}")
+                    if API_URL:
+                        api_url = f"{API_URL}/{quote(key, safe='')}"
+                        st.markdown("**Webhook URL (GET/POST):**")
+                    else:
+                        api_url = f"{BASE_URL}?endpoint={key}"
+                        st.markdown("**Webhook URL (GET):**")
+                    st.code(api_url, language="text")
+
+                    if st.toggle("View Current JSON", key=f"view_{key}"):
+                        endpoint_bytes = load_endpoint_bytes(key)
+                        if endpoint_bytes is not None:
+                            st.json(endpoint_bytes.decode())
+
+                    # Deleting from the click callback runs before the fragment
+                    # reruns, so the listing above is loaded once and already
+                    # reflects it, with no extra st.rerun().
+                    st.button("🗑️ Delete", key=f"del_{key}", use_container_width=True, type="secondary",
+                              on_click=delete_endpoint, args=(key,))
+    else:
+        st.info("You haven't created any endpoints yet. Use the form above to get started.")
+
+render_endpoints()
@@ -0,0 +1,312 @@
+import contextlib
+import json
+import logging
+import os
+import re
+import threading
+from pathlib import Path
+from urllib.parse import quote, unquote
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Prefer orjson for (de)serializing endpoint files and user input; fall back
+# to the stdlib. orjson.JSONDecodeError subclasses json.JSONDecodeError.
+# Endpoint files are machine-read, so they are written compactly.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# orjson only handles 64-bit integers; longer ones are parsed by the stdlib so
+# they are not rounded to floats. A 19-digit run may just be part of a string,
+# which merely takes the slower path.
+_LONG_INT = {str: re.compile(r"\d{19}"), bytes: re.compile(rb"\d{19}")}
+
+
+def loads_json(data):
+    """Parses JSON from str or bytes the way the stdlib json module would.
+
+    orjson does the work unless the input holds integers wider than 64 bits or
+    NaN/Infinity, which only the stdlib accepts. Raises json.JSONDecodeError
+    for invalid JSON, or UnicodeDecodeError for bytes that are not UTF-8.
+    """
+    if orjson is not None and not _LONG_INT[type(data)].search(data):
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(data)
+
+
+def _dumps(obj):
+    """Serializes obj compactly to bytes, with the stdlib for what orjson rejects.
+
+    orjson writes NaN and Infinity as null.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj)
+        except orjson.JSONEncodeError:
+            pass
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+# --- Configuration & Data Persistence ---
+# Each endpoint lives in its own file under ENDPOINT_DIR, so saving or reading
+# one endpoint never touches the others. DATA_FILE is the old single-file
+# store, migrated on first import.
+logger = logging.getLogger(__name__)
+
+DATA_FILE = Path("endpoints.json")
+ENDPOINT_DIR = Path("endpoints")
+ENDPOINT_DIR.mkdir(exist_ok=True)
+
+# Every write (save_endpoint, update_endpoint, delete_endpoint and the legacy
+# migration) holds an exclusive flock on LOCK_FILE for its whole
+# check-write-replace sequence, including update_endpoint's read and merge.
+# Writers in every process sharing ENDPOINT_DIR (Streamlit sessions and
+# workers, api.py) are therefore applied one at a time, in lock order.
+# Readers take no lock: every write ends in an atomic os.replace, so a reader
+# sees either the old file or the new one. Single-session deployments can skip
+# locking with ENDPOINTS_NO_LOCK=1.
+LOCK_FILE = ENDPOINT_DIR / ".lock"
+_NEEDS_LOCK = os.getenv("ENDPOINTS_NO_LOCK") != "1"
+_thread_lock = threading.Lock()
+
+# Serialized endpoint files keyed by name, as (version, bytes), where version
+# is the file's (st_ino, st_mtime_ns, st_size), so reads can hand out the
+# stored JSON without touching the file again until it changes. Living in an
+# imported module, the cache survives Streamlit reruns and is shared by all
+# sessions. Files of MAX_CACHED_BYTES or more are never cached; api.py streams
+# those from disk instead.
+MAX_CACHED_BYTES = 1 << 20
+_BYTES_CACHE = {}
+
+
+@contextlib.contextmanager
+def _locked():
+    """Holds the store's exclusive writer lock.
+
+    The lock file is opened per acquisition, so threads in one process exclude
+    each other the same way separate processes do. Without fcntl, this falls
+    back to an in-process lock.
+    """
+    if not _NEEDS_LOCK:
+        yield
+    elif fcntl is None:
+        with _thread_lock:
+            yield
+    else:
+        with open(LOCK_FILE, "ab") as lock_fh:
+            fcntl.flock(lock_fh, fcntl.LOCK_EX)
+            yield
+
+
+# Longest escaped name that, with ".json" and a temp-file suffix, still fits
+# the usual 255-byte file name limit.
+MAX_ESCAPED_NAME = 200
+
+
+def endpoint_name_too_long(key):
+    """Returns True if key's escaped file name would exceed the file name limit."""
+    return len(quote(key, safe="")) > MAX_ESCAPED_NAME
+
+
+def _endpoint_path(key):
+    """Maps an endpoint name to its file, escaping characters unsafe in file names.
+
+    Raises ValueError if the escaped name is too long to be a file name.
+    """
+    escaped = quote(key, safe="")
+    if len(escaped) > MAX_ESCAPED_NAME:
+        raise ValueError(f"endpoint name too long: {key[:40]!r}...")
+    return ENDPOINT_DIR / (escaped + ".json")
+
+
+def _file_version(path):
+    """Returns the (st_ino, st_mtime_ns, st_size) triple used to validate cache entries.
+
+    Every save swaps in a new file, and so a new inode, so a save from another
+    process is noticed even if it lands in the same mtime tick with the same size.
+    """
+    stat = path.stat()
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+def _write_temp(path, payload):
+    """Writes and fsyncs payload to a temporary file next to path.
+
+    The name is unique per process and thread, so concurrent saves never share
+    a temporary file. Returns its path, ready for os.replace.
+    """
+    tmp = path.with_name(f"{path.name}.{os.getpid()}-{threading.get_ident()}.tmp")
+    # The payload is already bytes, so write it straight to the descriptor
+    # without a Python-level buffer; the loop only matters on short writes.
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+    try:
+        view = memoryview(payload)
+        while view:
+            view = view[os.write(fd, view):]
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+    return tmp
+
+
+def _read_endpoint_bytes(key):
+    """Returns the cached file contents for key, re-reading them if changed.
+
+    Runs without the lock. If a save lands between the stat and the read, the
+    entry is filed under the older version and is simply re-read next time.
+    """
+    try:
+        path = _endpoint_path(key)
+        version = _file_version(path)
+        cached = _BYTES_CACHE.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        blob = path.read_bytes()
+    except FileNotFoundError:
+        _BYTES_CACHE.pop(key, None)
+        return None
+    except ValueError:
+        return None
+    _cache_bytes(key, version, blob)
+    return blob
+
+
+def _cache_bytes(key, version, blob):
+    """Caches blob as key's contents at version, unless it is too large to keep."""
+    if len(blob) < MAX_CACHED_BYTES:
+        _BYTES_CACHE[key] = (version, blob)
+    else:
+        _BYTES_CACHE.pop(key, None)
+
+
+def _migrate_legacy_file():
+    """Splits a pre-existing endpoints.json into per-endpoint files.
+
+    The legacy file is only renamed away once every endpoint in it has been
+    migrated; otherwise it is left in place and the problem is logged.
+    """
+    with _locked():
+        if not DATA_FILE.exists():
+            return
+        # The stdlib wrote this file, so the stdlib reads it back and writes
+        # each endpoint out again, keeping NaN, Infinity and big integers.
+        try:
+            legacy = json.loads(DATA_FILE.read_text(encoding="utf-8"))
+        except ValueError as e:
+            logger.error("Could not parse %s, leaving it unmigrated: %s", DATA_FILE, e)
+            return
+        if not isinstance(legacy, dict):
+            logger.error("%s does not hold a JSON object, leaving it unmigrated", DATA_FILE)
+            return
+        skipped = []
+        for key, data in legacy.items():
+            if endpoint_name_too_long(key):
+                skipped.append(key)
+                continue
+            path = _endpoint_path(key)
+            if not path.exists():
+                payload = json.dumps(data, separators=(",", ":")).encode()
+                os.replace(_write_temp(path, payload), path)
+        if skipped:
+            logger.error(
+                "Endpoint names too long to migrate, keeping %s: %s",
+                DATA_FILE, ", ".join(repr(key[:40]) for key in skipped),
+            )
+            return
+        DATA_FILE.rename(DATA_FILE.with_suffix(".json.migrated"))
+
+
+def list_endpoints():
+    """Returns the names of all stored endpoints, sorted."""
+    return sorted(unquote(p.name[:-len(".json")]) for p in ENDPOINT_DIR.glob("*.json"))
+
+
+def load_endpoint_bytes(key):
+    """Loads a single endpoint's serialized JSON, or None if it does not exist."""
+    return _read_endpoint_bytes(key)
+
+
+def endpoint_size(key):
+    """Returns the size in bytes of a single endpoint's file, or None if it does not exist."""
+    try:
+        return _endpoint_path(key).stat().st_size
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def open_endpoint(key):
+    """Opens a single endpoint's file for reading, or returns None if it does not exist.
+
+    The handle keeps reading the version it opened even if the endpoint is
+    saved again meanwhile, since saves swap in a new file.
+    """
+    try:
+        return open(_endpoint_path(key), "rb")
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def save_endpoint(key, data):
+    """Saves a single endpoint's data to its own file safely.
+
+    Returns False, without writing, if the file already holds exactly this data.
+    Raises ValueError if the name is too long (see endpoint_name_too_long).
+    """
+    payload = _dumps(data)
+    with _locked():
+        return _save_locked(key, payload, _read_endpoint_bytes(key))
+
+
+def update_endpoint(key, patch):
+    """Merges the patch dict into an existing endpoint that holds a JSON object.
+
+    The endpoint is read straight from its file, bypassing the caches, then
+    merged and written under the writer lock, so concurrent updates from any
+    process each see the previous one's keys. Returns
+    (payload, changed), where payload is the endpoint's serialized JSON after
+    the merge, or None if the endpoint does not exist. Raises TypeError if the
+    stored value is not a JSON object.
+    """
+    with _locked():
+        try:
+            current = _endpoint_path(key).read_bytes()
+            current_data = loads_json(current)
+        except (FileNotFoundError, ValueError):
+            return None
+        if not isinstance(current_data, dict):
+            raise TypeError(f"endpoint {key!r} does not hold a JSON object")
+        merged_data = {**current_data, **patch}
+        payload = _dumps(merged_data)
+        return payload, _save_locked(key, payload, current)
+
+
+def _save_locked(key, payload, current):
+    """Writes payload for key unless it equals current, the file's bytes; needs _locked().
+
+    The unchanged check, the write and the swap into place all run under the
+    lock, so saves land in the order they took it and none is lost to a
+    racing writer.
+    """
+    # Re-submitting unchanged data is common; skip the write and fsync.
+    if current == payload:
+        return False
+    path = _endpoint_path(key)
+    os.replace(_write_temp(path, payload), path)
+    _cache_bytes(key, _file_version(path), payload)
+    return True
+
+
+def delete_endpoint(key):
+    """Removes a single endpoint's file, if present."""
+    with _locked():
+        _endpoint_path(key).unlink(missing_ok=True)
+        _BYTES_CACHE.pop(key, None)
+
+
+_migrate_legacy_file()
@@ -0,0 +1,27 @@
+import importlib
+import os
+import sys
+import tempfile
+import unittest
+
+
+def fresh_module(name):
+    """Imports name anew, so module-level paths bind to the current directory."""
+    if name in sys.modules:
+        return importlib.reload(sys.modules[name])
+    return importlib.import_module(name)
+
+
+class StoreTestCase(unittest.TestCase):
+    """Runs each test in its own temporary directory with a freshly loaded store."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(tmp.name)
+        self.reload_store()
+
+    def reload_store(self):
+        """Re-imports storage, which runs the legacy migration again."""
+        self.storage = fresh_module("storage")
@@ -0,0 +1,82 @@
+import http.client
+import json
+import threading
+
+from tests import StoreTestCase, fresh_module
+
+
+class WebhookHandlerTest(StoreTestCase):
+    """Talks HTTP to a ReusePortHTTPServer on an ephemeral port."""
+
+    def setUp(self):
+        super().setUp()
+        api = fresh_module("api")
+        handler = type("QuietHandler", (api.WebhookHandler,), {"log_message": lambda *args: None})
+        httpd = api.ReusePortHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        self.addCleanup(httpd.server_close)
+        self.addCleanup(httpd.shutdown)
+        self.conn = http.client.HTTPConnection(*httpd.server_address, timeout=5)
+        self.addCleanup(self.conn.close)
+        self.storage.save_endpoint("user info", {"a": 1})
+
+    def request(self, method, path, body=None, headers=None):
+        self.conn.request(method, path, body, headers or {})
+        response = self.conn.getresponse()
+        return response, response.read()
+
+    def test_get(self):
+        response, body = self.request("GET", "/user%20info")
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.getheader("Content-Type"), "application/json")
+        self.assertEqual(body, b'{"a":1}')
+
+    def test_get_streams_large_files(self):
+        data = {"x": "y" * (2 << 20)}
+        self.storage.save_endpoint("big", data)
+        response, body = self.request("GET", "/big")
+        self.assertEqual(response.status, 200)
+        self.assertEqual(json.loads(body), data)
+
+    def test_get_missing(self):
+        response, body = self.request("GET", "/missing")
+        self.assertEqual(response.status, 404)
+        self.assertEqual(json.loads(body), {"error": "Endpoint not found"})
+
+    def test_post_merges(self):
+        response, body = self.request("POST", "/user%20info", b'{"b": 2}')
+        self.assertEqual(response.status, 200)
+        self.assertEqual(json.loads(body), {"a": 1, "b": 2})
+        # The merge is persisted, and the connection stays usable.
+        response, body = self.request("GET", "/user%20info")
+        self.assertEqual(json.loads(body), {"a": 1, "b": 2})
+
+    def test_post_rejects_bad_bodies(self):
+        for body in (b"{x", b"\xff\xfe{", b"[1]"):
+            with self.subTest(body=body):
+                response, _ = self.request("POST", "/user%20info", body)
+                self.assertEqual(response.status, 400)
+        response, _ = self.request("POST", "/missing", b"{}")
+        self.assertEqual(response.status, 404)
+
+    def test_post_without_content_length(self):
+        self.conn.putrequest("POST", "/user%20info")
+        self.conn.endheaders()
+        response = self.conn.getresponse()
+        response.read()
+        self.assertEqual(response.status, 411)
+        self.assertEqual(response.getheader("Connection"), "close")
+
+    def test_post_invalid_content_length(self):
+        for length in ("abc", "-5"):
+            with self.subTest(length=length):
+                self.conn.close()
+                response, _ = self.request("POST", "/user%20info", headers={"Content-Length": length})
+                self.assertEqual(response.status, 400)
+                self.assertEqual(response.getheader("Connection"), "close")
+
+    def test_post_too_large(self):
+        headers = {"Content-Length": str((1 << 20) + 1)}
+        response, _ = self.request("POST", "/user%20info", headers=headers)
+        self.assertEqual(response.status, 413)
+        self.assertEqual(response.getheader("Connection"), "close")
@@ -0,0 +1,133 @@
+import json
+import math
+import os
+import threading
+from pathlib import Path
+
+from tests import StoreTestCase
+
+
+class MigrationTest(StoreTestCase):
+    def write_legacy(self, text):
+        Path("endpoints.json").write_text(text, encoding="utf-8")
+
+    def test_splits_legacy_file(self):
+        self.write_legacy('{"user info": {"a": 1}, "list": [1, 2]}')
+        self.reload_store()
+        self.assertEqual(self.storage.list_endpoints(), ["list", "user info"])
+        self.assertEqual(self.storage.load_endpoint_bytes("user info"), b'{"a":1}')
+        self.assertFalse(Path("endpoints.json").exists())
+        self.assertTrue(Path("endpoints.json.migrated").exists())
+
+    def test_keeps_values_only_stdlib_json_accepts(self):
+        self.write_legacy('{"a": {"x": NaN}, "b": {"big": %d}}' % 2**70)
+        self.reload_store()
+        self.assertEqual(self.storage.list_endpoints(), ["a", "b"])
+        self.assertEqual(self.storage.load_endpoint_bytes("a"), b'{"x":NaN}')
+        payload, _ = self.storage.update_endpoint("b", {"c": 1})
+        self.assertEqual(json.loads(payload), {"big": 2**70, "c": 1})
+
+    def test_unparsable_legacy_file_is_logged_and_kept(self):
+        self.write_legacy("{not json")
+        with self.assertLogs("storage", "ERROR"):
+            self.reload_store()
+        self.assertTrue(Path("endpoints.json").exists())
+
+    def test_too_long_names_keep_legacy_file(self):
+        long_name = "z" * 300
+        self.write_legacy(json.dumps({"ok": {}, long_name: {}}))
+        with self.assertLogs("storage", "ERROR"):
+            self.reload_store()
+        self.assertEqual(self.storage.list_endpoints(), ["ok"])
+        self.assertTrue(Path("endpoints.json").exists())
+
+
+class SaveUpdateDeleteTest(StoreTestCase):
+    def test_save_and_load(self):
+        self.assertTrue(self.storage.save_endpoint("a/b c", {"x": 1}))
+        self.assertEqual(self.storage.list_endpoints(), ["a/b c"])
+        self.assertEqual(self.storage.load_endpoint_bytes("a/b c"), b'{"x":1}')
+        self.assertIsNone(self.storage.load_endpoint_bytes("missing"))
+
+    def test_unchanged_save_is_skipped(self):
+        self.storage.save_endpoint("ep", {"x": 1})
+        before = Path("endpoints/ep.json").stat()
+        self.assertFalse(self.storage.save_endpoint("ep", {"x": 1}))
+        after = Path("endpoints/ep.json").stat()
+        self.assertEqual((before.st_ino, before.st_mtime_ns), (after.st_ino, after.st_mtime_ns))
+        # Equal as Python values, but not the same JSON.
+        self.assertTrue(self.storage.save_endpoint("ep", {"x": True}))
+
+    def test_too_long_name_is_rejected(self):
+        name = "名" * 90
+        self.assertTrue(self.storage.endpoint_name_too_long(name))
+        with self.assertRaises(ValueError):
+            self.storage.save_endpoint(name, {})
+        self.assertIsNone(self.storage.load_endpoint_bytes(name))
+        self.assertIsNone(self.storage.update_endpoint(name, {}))
+
+    def test_update_merges(self):
+        self.storage.save_endpoint("ep", {"a": 1, "b": 2})
+        payload, changed = self.storage.update_endpoint("ep", {"b": 3, "c": 4})
+        self.assertTrue(changed)
+        self.assertEqual(json.loads(payload), {"a": 1, "b": 3, "c": 4})
+        self.assertEqual(self.storage.load_endpoint_bytes("ep"), payload)
+        self.assertEqual(self.storage.update_endpoint("ep", {"c": 4}), (payload, False))
+
+    def test_update_missing_or_non_object(self):
+        self.assertIsNone(self.storage.update_endpoint("missing", {"a": 1}))
+        self.storage.save_endpoint("list", [1])
+        with self.assertRaises(TypeError):
+            self.storage.update_endpoint("list", {"a": 1})
+
+    def test_delete(self):
+        self.storage.save_endpoint("ep", {})
+        self.storage.load_endpoint_bytes("ep")
+        self.storage.delete_endpoint("ep")
+        self.storage.delete_endpoint("ep")
+        self.assertEqual(self.storage.list_endpoints(), [])
+        self.assertIsNone(self.storage.load_endpoint_bytes("ep"))
+
+    def test_reads_notice_same_size_save_from_elsewhere(self):
+        self.storage.save_endpoint("ep", {"s": "b"})
+        path = Path("endpoints/ep.json")
+        stat = path.stat()
+        self.assertEqual(self.storage.load_endpoint_bytes("ep"), b'{"s":"b"}')
+        # Another process swaps in a same-size file within the same mtime tick.
+        tmp = path.with_name("other.tmp")
+        tmp.write_bytes(b'{"s":"c"}')
+        tmp.replace(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        self.assertEqual(self.storage.load_endpoint_bytes("ep"), b'{"s":"c"}')
+        payload, _ = self.storage.update_endpoint("ep", {"t": 1})
+        self.assertEqual(json.loads(payload), {"s": "c", "t": 1})
+
+    def test_large_files_are_not_cached(self):
+        self.storage.save_endpoint("big", {"x": "y" * self.storage.MAX_CACHED_BYTES})
+        self.storage.save_endpoint("small", {})
+        self.storage.load_endpoint_bytes("big")
+        self.assertEqual(list(self.storage._BYTES_CACHE), ["small"])
+
+    def test_concurrent_updates_keep_every_key(self):
+        self.storage.save_endpoint("ep", {})
+        threads = [
+            threading.Thread(target=self.storage.update_endpoint, args=("ep", {f"k{i}": i}))
+            for i in range(40)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        data = json.loads(self.storage.load_endpoint_bytes("ep"))
+        self.assertEqual(data, {f"k{i}": i for i in range(40)})
+
+
+class LoadsJsonTest(StoreTestCase):
+    def test_accepts_what_stdlib_json_accepts(self):
+        loads_json = self.storage.loads_json
+        self.assertEqual(loads_json(b'{"big": %d}' % 2**70), {"big": 2**70})
+        self.assertTrue(math.isnan(loads_json('{"x": NaN}')["x"]))
+        with self.assertRaises(json.JSONDecodeError):
+            loads_json("{x")
+        with self.assertRaises(ValueError):
+            loads_json(b"\xff\xfe{")